@@ -0,0 +1,94 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional native number parser for touchstone.py.
+
+Build in place (needs Cython and a C compiler):
+    cythonize -i snp_viewer/_touchstone_c.pyx
+When the extension is missing, read_touchstone uses its NumPy/regex path.
+"""
+import numpy as np
+
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from libc.string cimport memcpy
+
+
+cdef extern from "Python.h":
+    # Locale-independent strtod (Qt sets LC_NUMERIC from the environment).
+    double PyOS_string_to_double(const char *s, char **endptr, void *overflow_exception)
+    void PyErr_Clear()
+
+
+cdef enum:
+    MAX_TOKEN = 64
+
+
+cdef inline bint _is_space(unsigned char c) noexcept nogil:
+    return c == 32 or 9 <= c <= 13
+
+
+def parse(const unsigned char[::1] buf):
+    """
+    Flat float64 array of every number in buf (bytes, mmap, ...).
+    Skips "!" comments and "#" option lines; a lone "\\r" also ends a line. Same token
+    rule as the Python path: a whitespace-delimited token is data only if float()
+    accepts all of it.
+    """
+    cdef Py_ssize_t n = buf.shape[0]
+    cdef Py_ssize_t pos = 0, start, length, count = 0
+    # Typical sNp data is ~12 bytes per number; grow if the guess is short.
+    cdef Py_ssize_t cap = n // 12 + 16
+    cdef bint line_start = True
+    cdef unsigned char c
+    cdef char tok[MAX_TOKEN]
+    cdef char *end
+    cdef double value
+
+    out = np.empty(cap, dtype=np.float64)
+    cdef double[::1] view = out
+
+    while pos < n:
+        c = buf[pos]
+        if c == b'\n' or c == b'\r':
+            line_start = True
+            pos += 1
+            continue
+        if _is_space(c):
+            # Option lines may only be indented with spaces/tabs (as in _NON_DATA_RE).
+            if c != b' ' and c != b'\t':
+                line_start = False
+            pos += 1
+            continue
+        if c == b'!' or (c == b'#' and line_start):
+            while pos < n and buf[pos] != b'\n' and buf[pos] != b'\r':
+                pos += 1
+            continue
+
+        line_start = False
+        start = pos
+        while pos < n and not _is_space(buf[pos]) and buf[pos] != b'!':
+            pos += 1
+        length = pos - start
+
+        end = NULL
+        if length < MAX_TOKEN:
+            memcpy(tok, &buf[start], length)
+            tok[length] = 0
+            value = PyOS_string_to_double(tok, &end, NULL)
+        if end == NULL or end != tok + length:
+            # Long or unusual token (e.g. "1_000"): let float() decide, as the Python path does.
+            PyErr_Clear()
+            try:
+                value = float(PyBytes_FromStringAndSize(<const char *>&buf[start], length))
+            except ValueError:
+                continue
+
+        if count == cap:
+            cap *= 2
+            grown = np.empty(cap, dtype=np.float64)
+            grown[:count] = out[:count]
+            out = grown
+            view = out
+        view[count] = value
+        count += 1
+
+    return out[:count].copy()
@@ -3,6 +3,11 @@ import numpy as np
 
 def sparam_db(s: np.ndarray) -> np.ndarray:
     """Return magnitude in dB, safe for zeros."""
-    mag = np.abs(s)
-    mag = np.maximum(mag, 1e-20)
-    return 20.0 * np.log10(mag)
+    return sparam_db_ri(s.real, s.imag)
+
+def sparam_db_ri(s_re: np.ndarray, s_im: np.ndarray) -> np.ndarray:
+    """Same as sparam_db, from separate real/imaginary arrays."""
+    # 20*log10(|s|) == 10*log10(re^2 + im^2): skips the sqrt inside np.abs.
+    p = s_re * s_re + s_im * s_im
+    np.maximum(p, 1e-40, out=p)
+    return 10.0 * np.log10(p)
@@ -1,21 +1,62 @@
 from __future__ import annotations
 
+import functools
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, List, Tuple
 
 import numpy as np
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QFileDialog, QMessageBox, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QComboBox, QCheckBox, QSplitter, QTextEdit, QGroupBox
+    QPushButton, QLabel, QComboBox, QCheckBox, QSplitter, QTextEdit, QGroupBox,
+    QProgressBar
 )
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.ticker import MaxNLocator
 
 from snp_viewer.touchstone import TouchstoneData, read_touchstone
-from snp_viewer.analysis import sparam_db
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_read(path_str: str, mtime_ns: int, size: int) -> TouchstoneData:
+    # mtime/size are part of the key so an edited file is parsed again.
+    return read_touchstone(Path(path_str), symmetric=True, cache=True)
+
+
+def _read_touchstone_cached(p: Path) -> TouchstoneData:
+    st = os.stat(p)
+    return _cached_read(str(p), st.st_mtime_ns, st.st_size)
+
+
+class _LoadSignals(QObject):
+    # (role, seq, path, data) / (role, seq, path, error message)
+    finished = pyqtSignal(str, int, object, object)
+    failed = pyqtSignal(str, int, object, str)
+
+
+class _LoadWorker(QRunnable):
+    """Parses a Touchstone file off the GUI thread; results come back via signals."""
+
+    def __init__(self, role: str, seq: int, p: Path):
+        super().__init__()
+        self.role = role
+        self.seq = seq
+        self.p = p
+        self.signals = _LoadSignals()
+
+    def run(self):
+        try:
+            data = _read_touchstone_cached(self.p)
+        except Exception as e:
+            self.signals.failed.emit(self.role, self.seq, self.p, str(e))
+            return
+        self.signals.finished.emit(self.role, self.seq, self.p, data)
 
 
 @dataclass
@@ -25,12 +66,59 @@ class LoadedFile:
 
 
 class MplCanvas(FigureCanvas):
+    # Emitted after a full draw that changed the axes' pixel width (resize, relayout).
+    axes_width_changed = pyqtSignal()
+
     def __init__(self, parent: Optional[QWidget] = None):
         self.fig = Figure()
         super().__init__(self.fig)
         self.ax = self.fig.add_subplot(111)
+        self.ax.set_xlabel("Frequency (GHz)")
+        self.ax.set_ylabel("Magnitude (dB)")
+        self.ax.grid(True)
+        # Every tick is its own artist; cap them so wide GHz sweeps stay cheap to draw.
+        self.ax.xaxis.set_major_locator(MaxNLocator(6))
+        self.ax.yaxis.set_major_locator(MaxNLocator(6))
+        self.ax.minorticks_off()
+
+        # Primary + compare traces live in one persistent LineCollection (segment 0/1).
+        # It is animated so a full draw leaves it out of the cached background;
+        # updates then only restore + redraw the traces (blit).
+        self.traces = LineCollection([], colors=["C0", "C1"], animated=True)
+        self.ax.add_collection(self.traces, autolim=False)
+        # Collections have no per-segment legend entries; these proxies stand in.
+        self.legend_primary = Line2D([], [], color="C0")
+        self.legend_compare = Line2D([], [], color="C1")
+        self._bg = None
+        self._axes_width = None
+        self.mpl_connect("draw_event", self._on_draw)
         self.fig.tight_layout()
 
+    def update_traces(self):
+        """Redraw only the traces over the cached background."""
+        if self._bg is None:
+            self.draw()
+            return
+        self.restore_region(self._bg)
+        self._draw_animated()
+        self.blit(self.fig.bbox)
+
+    def _on_draw(self, event):
+        # Any full draw (resize, limits/legend change) invalidates the background.
+        self._bg = self.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+        width = int(self.ax.bbox.width)
+        if width != self._axes_width:
+            self._axes_width = width
+            self.axes_width_changed.emit()
+
+    def _draw_animated(self):
+        # The legend is animated too, so it is painted on top of the blitted traces.
+        self.ax.draw_artist(self.traces)
+        legend = self.ax.get_legend()
+        if legend is not None:
+            self.ax.draw_artist(legend)
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -39,6 +127,16 @@ class MainWindow(QMainWindow):
 
         self.loaded_primary: Optional[LoadedFile] = None
         self.loaded_compare: Optional[LoadedFile] = None
+        self._plot_state = None
+        # tight_layout re-measures every text artist; only redo it when labels change.
+        self._layout_dirty = False
+
+        # Files are parsed on a single background thread: loads run in the order they
+        # were requested and never run the parser concurrently.
+        self._load_pool = QThreadPool(self)
+        self._load_pool.setMaxThreadCount(1)
+        self._load_seq = {"primary": 0, "compare": 0}
+        self._loads_pending = 0
 
         root = QWidget()
         self.setCentralWidget(root)
@@ -63,7 +161,7 @@ class MainWindow(QMainWindow):
             "S12 [dB]",
             "S22 [dB]",
         ])
-        self.cmb_plot.currentIndexChanged.connect(self.refresh_plot)
+        self.cmb_plot.currentIndexChanged.connect(self.on_metric_changed)
 
         self.chk_smooth = QCheckBox("Light smoothing (moving avg)")
         self.chk_smooth.stateChanged.connect(self.refresh_plot)
@@ -72,6 +170,11 @@ class MainWindow(QMainWindow):
         self.lbl_compare = QLabel("Compare: (none)")
         self.lbl_ports = QLabel("Ports: -")
 
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)  # busy indicator
+        self.progress.setTextVisible(False)
+        self.progress.hide()
+
         self.log = QTextEdit()
         self.log.setReadOnly(True)
         self.log.setPlaceholderText("Log / notes...")
@@ -95,6 +198,7 @@ class MainWindow(QMainWindow):
         controls.addWidget(grp_plot)
         controls.addSpacing(8)
         controls.addWidget(self.lbl_ports)
+        controls.addWidget(self.progress)
         controls.addSpacing(8)
         controls.addWidget(self.btn_export_report)
         controls.addSpacing(8)
@@ -106,6 +210,8 @@ class MainWindow(QMainWindow):
 
         # Right panel plot
         self.canvas = MplCanvas()
+        # Decimation depends on the pixel width; queued so it runs after the draw finishes.
+        self.canvas.axes_width_changed.connect(self._on_axes_resized, Qt.QueuedConnection)
         right_layout = QVBoxLayout()
         right_layout.addWidget(self.canvas)
         right = QWidget()
@@ -137,7 +243,16 @@ class MainWindow(QMainWindow):
             return
         self._load_compare(Path(path))
 
+    def on_metric_changed(self):
+        self._layout_dirty = True
+        self.refresh_plot()
+
+    def _on_axes_resized(self):
+        if self.loaded_primary:
+            self.refresh_plot()
+
     def on_clear_compare(self):
+        self._load_seq["compare"] += 1  # drop a compare load still in flight
         self.loaded_compare = None
         self.lbl_compare.setText("Compare: (none)")
         self._log("Compare file cleared.")
@@ -174,25 +289,51 @@ class MainWindow(QMainWindow):
     # Loading
     # -------------------------
     def _load_primary(self, p: Path):
-        try:
-            data = read_touchstone(p)
-        except Exception as e:
-            QMessageBox.critical(self, "Load Error", f"Failed to read file:\n{p}\n\n{e}")
+        self._start_load("primary", p)
+
+    def _load_compare(self, p: Path):
+        self._start_load("compare", p)
+
+    def _start_load(self, role: str, p: Path):
+        self._load_seq[role] += 1
+        worker = _LoadWorker(role, self._load_seq[role], p)
+        worker.signals.finished.connect(self._on_load_finished)
+        worker.signals.failed.connect(self._on_load_failed)
+        self._loads_pending += 1
+        self.progress.show()
+        self._log(f"Loading {role}: {p} ...")
+        self._load_pool.start(worker)
+
+    def _on_load_finished(self, role: str, seq: int, p: Path, data: TouchstoneData):
+        self._load_done()
+        if seq != self._load_seq[role]:
+            return  # superseded by a newer load (or a clear)
+        if role == "primary":
+            self._set_primary(p, data)
+        else:
+            self._set_compare(p, data)
+
+    def _on_load_failed(self, role: str, seq: int, p: Path, msg: str):
+        self._load_done()
+        if seq != self._load_seq[role]:
             return
+        QMessageBox.critical(self, "Load Error", f"Failed to read file:\n{p}\n\n{msg}")
+
+    def _load_done(self):
+        self._loads_pending -= 1
+        if not self._loads_pending:
+            self.progress.hide()
 
+    def _set_primary(self, p: Path, data: TouchstoneData):
+        if not self.loaded_primary or self.loaded_primary.data.nports != data.nports:
+            self._layout_dirty = True
         self.loaded_primary = LoadedFile(p, data)
         self.lbl_primary.setText(f"Primary: {p.name}")
         self.lbl_ports.setText(f"Ports: {data.nports}, Points: {len(data.freq_hz)}")
         self._log(f"Loaded primary: {p}  (ports={data.nports}, points={len(data.freq_hz)})")
         self.refresh_plot()
 
-    def _load_compare(self, p: Path):
-        try:
-            data = read_touchstone(p)
-        except Exception as e:
-            QMessageBox.critical(self, "Load Error", f"Failed to read file:\n{p}\n\n{e}")
-            return
-
+    def _set_compare(self, p: Path, data: TouchstoneData):
         if self.loaded_primary and data.nports != self.loaded_primary.data.nports:
             QMessageBox.warning(
                 self,
@@ -210,45 +351,80 @@ class MainWindow(QMainWindow):
     # Plot
     # -------------------------
     def refresh_plot(self):
-        self.canvas.ax.clear()
+        ax = self.canvas.ax
 
         if not self.loaded_primary:
-            self.canvas.ax.set_title("Load a .sNp file to plot")
-            self.canvas.draw()
+            self._show_empty_plot("Load a .sNp file to plot")
             return
 
         metric = self.cmb_plot.currentText()
         ij = self._metric_to_ij(metric, self.loaded_primary.data.nports)
         if ij is None:
             self._log(f"Unsupported metric selection: {metric}")
-            self.canvas.draw()
+            self._show_empty_plot("")
             return
 
         i, j = ij  # 0-based
         x_ghz, y_db = self._extract_db(self.loaded_primary.data, i, j)
         if self.chk_smooth.isChecked():
             y_db = self._smooth(y_db, win=7)
+        x_ghz, y_db = self._decimate(x_ghz, y_db)
 
-        self.canvas.ax.plot(x_ghz, y_db, label=f"Primary {metric}")
-        self.canvas.ax.set_xlabel("Frequency (GHz)")
-        self.canvas.ax.set_ylabel("Magnitude (dB)")
-        self.canvas.ax.grid(True)
+        segments = [np.column_stack((x_ghz, y_db))]
+        self.canvas.legend_primary.set_label(f"Primary {metric}")
+        handles = [self.canvas.legend_primary]
 
         # Compare overlay if present
         if self.loaded_compare:
             x2_ghz, y2_db = self._extract_db(self.loaded_compare.data, i, j)
             if self.chk_smooth.isChecked():
                 y2_db = self._smooth(y2_db, win=7)
-            self.canvas.ax.plot(x2_ghz, y2_db, label=f"Compare {metric}")
-
-        self.canvas.ax.legend(loc="best")
-        self.canvas.fig.tight_layout()
+            x2_ghz, y2_db = self._decimate(x2_ghz, y2_db)
+            segments.append(np.column_stack((x2_ghz, y2_db)))
+            self.canvas.legend_compare.set_label(f"Compare {metric}")
+            handles.append(self.canvas.legend_compare)
+
+        self.canvas.traces.set_segments(segments)
+        # relim() ignores collections, so rebuild the data limits from the segments.
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim(np.concatenate(segments))
+        ax.autoscale_view()
+
+        # Only limits/legend changes need a full redraw; otherwise blit the traces.
+        labels = tuple(h.get_label() for h in handles)
+        state = (ax.get_xlim(), ax.get_ylim(), labels)
+        if state != self._plot_state:
+            self._plot_state = state
+            self._set_title("")
+            legend = ax.legend(handles=handles, loc=self._legend_loc(segments))
+            legend.set_animated(True)
+            self._full_draw()
+        else:
+            self.canvas.update_traces()
+
+    def _show_empty_plot(self, title: str):
+        ax = self.canvas.ax
+        self.canvas.traces.set_segments([])
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        self._set_title(title)
+        self._plot_state = None
+        self._full_draw()
+
+    def _set_title(self, title: str):
+        if self.canvas.ax.get_title() != title:
+            self.canvas.ax.set_title(title)
+            self._layout_dirty = True
+
+    def _full_draw(self):
+        if self._layout_dirty:
+            self.canvas.fig.tight_layout()
+            self._layout_dirty = False
         self.canvas.draw()
 
     def _extract_db(self, data: TouchstoneData, i: int, j: int) -> Tuple[np.ndarray, np.ndarray]:
         f_ghz = data.freq_hz / 1e9
-        s = data.s[:, i, j]  # complex
-        return f_ghz, sparam_db(s)
+        return f_ghz, data.get_db(i, j)
 
     def _metric_to_ij(self, metric: str, nports: int) -> Optional[Tuple[int, int]]:
         # Minimal: map common 2-port use cases. For nports>2, still maps to first two ports.
@@ -277,8 +453,48 @@ class MainWindow(QMainWindow):
             win += 1
         if len(y) < win:
             return y
-        kernel = np.ones(win) / win
-        return np.convolve(y, kernel, mode="same")
+        # Moving average via running sum: O(N) regardless of window size.
+        c = np.cumsum(np.insert(y, 0, 0.0), dtype=np.float64)
+        ma = (c[win:] - c[:-win]) / win
+        half = win // 2
+        return np.pad(ma, (half, half), mode="edge").astype(y.dtype, copy=False)
+
+    def _legend_loc(self, segments: List[np.ndarray]) -> str:
+        # loc="best" only sees Line2D/Patch paths and collection offsets, so it is blind
+        # to the LineCollection. Pick the corner the traces pass through least instead.
+        ax = self.canvas.ax
+        counts = dict.fromkeys(("upper right", "upper left", "lower left", "lower right"), 0)
+        grid = np.linspace(0.0, 1.0, 101)
+        for seg in segments:
+            xy = ax.transLimits.transform(seg)  # data -> axes fraction
+            # Resample on a fixed grid as well so sparse traces still count where they cross.
+            y_grid = np.interp(grid, xy[:, 0], xy[:, 1], left=np.nan, right=np.nan)
+            x = np.concatenate((xy[:, 0], grid))
+            y = np.concatenate((xy[:, 1], y_grid))
+            left, right = x < 0.5, x > 0.5
+            low, high = y < 0.3, y > 0.7
+            counts["upper right"] += np.count_nonzero(right & high)
+            counts["upper left"] += np.count_nonzero(left & high)
+            counts["lower left"] += np.count_nonzero(left & low)
+            counts["lower right"] += np.count_nonzero(right & low)
+        # Ties keep the conventional upper-right placement.
+        return min(counts, key=counts.get)
+
+    def _decimate(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Dense sweeps are reduced to a min/max pair per pixel column, which keeps
+        # the visible envelope while handing Matplotlib ~2 vertices per pixel.
+        width = max(int(self.canvas.ax.bbox.width), 1)
+        if len(y) <= 4 * width:
+            return x, y
+        edges = np.linspace(0, len(y), width + 1).astype(int)
+        starts, ends = edges[:-1], edges[1:] - 1
+        x_dec = np.empty(2 * width, dtype=x.dtype)
+        y_dec = np.empty(2 * width, dtype=y.dtype)
+        x_dec[0::2] = x[starts]
+        x_dec[1::2] = x[ends]
+        y_dec[0::2] = np.minimum.reduceat(y, starts)
+        y_dec[1::2] = np.maximum.reduceat(y, starts)
+        return x_dec, y_dec
 
     def _log(self, msg: str):
         self.log.append(msg)
@@ -1,69 +1,120 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import mmap
+import os
+import re
+from dataclasses import dataclass, replace
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
 import numpy as np
 
+from snp_viewer.analysis import sparam_db_ri
+
+try:
+    # Optional compiled number parser (see _touchstone_c.pyx).
+    from snp_viewer import _touchstone_c
+except ImportError:
+    _touchstone_c = None
+
+# One leading non-data line: blank, "!" comment or option line ("# GHZ S RI R 50", group 1).
+# A lone "\r" also ends a line (classic Mac line endings).
+_LEAD_LINE_RE = re.compile(rb"[ \t]*(?:#([^\r\n]*)|![^\r\n]*)?(?:\r\n?|\n|\Z)")
+# Everything else that is not numeric data: "!" comments and option lines
+_NON_DATA_RE = re.compile(rb"![^\r\n]*|(?:^|(?<=\r))[ \t]*#[^\r\n]*", re.MULTILINE)
+# NumPy < 2 only warns (and truncates) on unparsable data, so it can't be trusted there.
+_FROMSTRING_RAISES = int(np.__version__.split(".")[0]) >= 2
+
 
 @dataclass
 class TouchstoneData:
     freq_hz: np.ndarray            # shape: (N,)
-    s: np.ndarray                  # shape: (N, P, P), complex
+    s_re: np.ndarray               # shape: (N, P, P), real part; (N, P*(P+1)/2) if symmetric
+    s_im: np.ndarray               # same shape as s_re, imaginary part
     nports: int
     fmt: str                       # "RI" / "MA" / "DB"
     z0: float                      # reference impedance (ohm)
+    symmetric: bool = False        # reciprocal network, only the upper triangle is stored
+
+    @property
+    def s(self) -> np.ndarray:
+        """Complex S-matrix, shape (N, P, P). Built on each access; prefer get()/s_re/s_im."""
+        s = self.s_re + 1j * self.s_im
+        if self.symmetric:
+            s = s[:, _tri_index(self.nports)]
+        return s
+
+    @cached_property
+    def s_db(self) -> np.ndarray:
+        """|S| in dB, same layout as s_re. Computed once on first use; see get_db()."""
+        return sparam_db_ri(self.s_re, self.s_im)
+
+    def get(self, i: int, j: int) -> np.ndarray:
+        """Complex S[i, j] over frequency, shape (N,)."""
+        col = self._col(i, j)
+        return self.s_re[col] + 1j * self.s_im[col]
+
+    def get_db(self, i: int, j: int) -> np.ndarray:
+        """|S[i, j]| in dB over frequency, shape (N,)."""
+        return self.s_db[self._col(i, j)]
 
+    def _col(self, i: int, j: int) -> tuple:
+        if self.symmetric:
+            return (slice(None), _tri_index(self.nports)[i, j])
+        return (slice(None), i, j)
 
-def read_touchstone(path: Path) -> TouchstoneData:
+
+def read_touchstone(
+    path: Path, dtype: np.dtype = np.float32, symmetric: bool = False, cache: bool = False
+) -> TouchstoneData:
     """
     Minimal Touchstone reader for .sNp (Touchstone 1.x style).
     Supports:
       - Frequency units: Hz/kHz/MHz/GHz
       - Data formats: RI / MA / DB
       - Reference: R <z0> (default 50)
+    S-parameters are stored as float32 by default (plenty for dB plots, half the memory);
+    pass dtype=np.float64 when full precision is needed. Frequencies are always float64.
+    With symmetric=True a reciprocal network (S == S^T exactly) keeps only its upper triangle;
+    non-reciprocal data is stored in full either way.
+    With cache=True the parsed arrays are kept in a sibling "<file>.npz" and reused
+    while the source file's size and mtime still match the ones recorded in it.
     Notes:
       - This is intentionally lightweight. Future: robust parsing, comments, mixed-mode, touchstone 2.0.
     """
-    text = Path(path).read_text(encoding="utf-8", errors="ignore").splitlines()
-    nports = _infer_nports(path.name)
-
-    unit_scale = 1.0
-    fmt = "RI"
-    z0 = 50.0
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    cache_path = path.with_name(path.name + ".npz")
 
-    data_rows: List[float] = []
+    # Stat before parsing so a file replaced mid-parse never matches its stale cache.
+    source = _source_stamp(path) if cache else None
+    data = _load_cache(cache_path, source, dtype) if cache else None
+    if data is None:
+        data = _parse_touchstone(path, dtype)
+        if cache:
+            _save_cache(cache_path, data, source)
 
-    for line in text:
-        line = line.strip()
-        if not line:
-            continue
-        if line.startswith("!"):
-            continue
+    if symmetric and _is_reciprocal(data.s_re, data.s_im):
+        rows_idx, cols_idx = np.triu_indices(data.nports)
+        data = replace(
+            data,
+            s_re=data.s_re[:, rows_idx, cols_idx],
+            s_im=data.s_im[:, rows_idx, cols_idx],
+            symmetric=True,
+        )
+    return data
 
-        if line.startswith("#"):
-            # Example: "# GHZ S RI R 50"
-            parts = line.upper().split()
-            unit_scale = _unit_scale(parts)
-            fmt = _parse_format(parts)
-            z0 = _parse_z0(parts)
-            continue
 
-        # Remove inline comment after !
-        if "!" in line:
-            line = line.split("!")[0].strip()
-        if not line:
-            continue
+def _parse_touchstone(path: Path, dtype: np.dtype) -> TouchstoneData:
+    nports = _infer_nports(path.name)
 
-        # Touchstone sometimes breaks one frequency point into multiple lines.
-        # We'll just collect floats and re-chunk later.
-        for tok in line.replace("\t", " ").split():
-            try:
-                data_rows.append(float(tok))
-            except ValueError:
-                # ignore weird tokens
-                pass
+    # Touchstone sometimes breaks one frequency point into multiple lines.
+    # Parse every number in one pass and re-chunk later.
+    data_rows, parts = _read_numbers(path)
+    unit_scale = _unit_scale(parts)
+    fmt = _parse_format(parts)
+    z0 = _parse_z0(parts)
 
     if nports <= 0:
         raise ValueError(f"Unable to infer port count from filename: {path.name}")
@@ -76,22 +127,173 @@ def read_touchstone(path: Path) -> TouchstoneData:
 
     # Chunk into points
     total_points = len(data_rows) // per_point
-    rows = np.array(data_rows[: total_points * per_point], dtype=float).reshape(total_points, per_point)
+    rows = data_rows[: total_points * per_point].reshape(total_points, per_point)
 
     freq = rows[:, 0] * unit_scale
-    vals = rows[:, 1:]  # shape (N, 2*nports*nports)
+    # Pairs are stored S11, S12, ... row by row, so this is a plain view of rows.
+    pair = rows[:, 1:].reshape(total_points, nports, nports, 2)
+
+    s_re, s_im = _to_ri(pair[..., 0], pair[..., 1], fmt, dtype)
+
+    return TouchstoneData(freq_hz=freq, s_re=s_re, s_im=s_im, nports=nports, fmt=fmt, z0=z0)
+
 
-    s = np.zeros((total_points, nports, nports), dtype=np.complex128)
+def _source_stamp(path: Path) -> np.ndarray:
+    """(size, mtime_ns) of the source file, as stored in its cache."""
+    st = path.stat()
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
 
-    idx = 0
+
+def _load_cache(cache_path: Path, source: np.ndarray, dtype: np.dtype) -> Optional[TouchstoneData]:
+    try:
+        with np.load(cache_path, allow_pickle=False) as d:
+            # Exact match: a replaced source may well be older than the cache.
+            if not np.array_equal(d["source"], source):
+                return None
+            # NpzFile re-reads a member on every access, so read each one once.
+            s_re = d["s_re"]
+            if s_re.dtype != dtype:
+                return None
+            return TouchstoneData(
+                freq_hz=d["freq_hz"],
+                s_re=s_re,
+                s_im=d["s_im"],
+                nports=int(d["nports"]),
+                fmt=str(d["fmt"]),
+                z0=float(d["z0"]),
+            )
+    except Exception:
+        # Missing, truncated/corrupt (BadZipFile, EOFError, ...) or foreign cache:
+        # just parse the file; the next save replaces the bad cache.
+        return None
+
+
+def _save_cache(cache_path: Path, data: TouchstoneData, source: np.ndarray) -> None:
+    # Write-then-rename so a concurrent reader never sees a half-written cache.
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as fh:
+            np.savez(
+                fh,
+                freq_hz=data.freq_hz,
+                s_re=data.s_re,
+                s_im=data.s_im,
+                nports=data.nports,
+                fmt=data.fmt,
+                z0=data.z0,
+                source=source,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Read-only data directory etc.; the cache is only an optimization.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _is_reciprocal(s_re: np.ndarray, s_im: np.ndarray) -> bool:
+    # Exact equality at every point, so dropping the lower triangle is lossless.
+    # Compared one (i, j)/(j, i) column pair at a time to keep temporaries at (N,).
+    nports = s_re.shape[1]
     for i in range(nports):
-        for j in range(nports):
-            a = vals[:, idx]
-            b = vals[:, idx + 1]
-            idx += 2
-            s[:, i, j] = _to_complex(a, b, fmt)
+        for j in range(i + 1, nports):
+            if not (
+                np.array_equal(s_re[:, i, j], s_re[:, j, i])
+                and np.array_equal(s_im[:, i, j], s_im[:, j, i])
+            ):
+                return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _tri_index(nports: int) -> np.ndarray:
+    """(P, P) map from (i, j) to the column of the packed upper triangle."""
+    idx = np.empty((nports, nports), dtype=np.intp)
+    rows_idx, cols_idx = np.triu_indices(nports)
+    idx[rows_idx, cols_idx] = np.arange(len(rows_idx))
+    idx[cols_idx, rows_idx] = idx[rows_idx, cols_idx]
+    return idx
+
+
+def _read_numbers(path: Path) -> Tuple[np.ndarray, List[str]]:
+    """
+    Memory-map the file and return every data number plus the option line tokens.
+    Works on raw bytes so the file is never decoded or split into Python lines.
+    """
+    with open(path, "rb") as fh:
+        if not path.stat().st_size:
+            return np.empty(0), []
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            header, start = _scan_header(buf)
+            if _touchstone_c is not None:
+                data_rows = _touchstone_c.parse(buf)
+            else:
+                data_rows = _parse_body(buf, start)
+
+    parts: List[str] = []
+    if header is not None:
+        # Drop any trailing "!" comment on the option line.
+        parts = header.split(b"!")[0].decode("ascii", errors="ignore").upper().split()
+    return data_rows, parts
+
+
+def _scan_header(buf: bytes) -> Tuple[Optional[bytes], int]:
+    """
+    Walk the comment/option lines before the first data line.
+    Returns the last option line found there (without "#") and the offset where data starts.
+    """
+    header = None
+    pos = 0
+    while True:
+        m = _LEAD_LINE_RE.match(buf, pos)
+        if m is None or m.end() == pos:
+            return header, pos
+        if m.group(1) is not None:
+            header = m.group(1)
+        pos = m.end()
 
-    return TouchstoneData(freq_hz=freq, s=s, nports=nports, fmt=fmt, z0=z0)
+
+def _parse_body(buf: bytes, start: int = 0) -> np.ndarray:
+    """Pure-Python counterpart of _touchstone_c.parse: drop comments/option lines, parse."""
+    body = buf[start:]
+    # Most files have no comments or option lines after the header; skip the full-copy sub.
+    if body.find(b"!") != -1 or body.find(b"#") != -1:
+        body = _NON_DATA_RE.sub(b" ", body)
+    return _parse_numbers(body)
+
+
+def _parse_numbers(body: bytes) -> np.ndarray:
+    """
+    Flat float64 array of every number in body.
+    np.fromstring handles clean data in a single C pass; if it trips over a stray
+    token, fall back to a token-wise reparse (see _parse_tokens).
+    """
+    if _FROMSTRING_RAISES:
+        try:
+            return np.fromstring(body, dtype=np.float64, sep=" ")
+        except ValueError:
+            pass
+    return _parse_tokens(body)
+
+
+def _parse_tokens(body: bytes) -> np.ndarray:
+    """
+    A whitespace-delimited token is data only if float() accepts all of it;
+    anything else ("S11", "1.0e", "1,5", ...) is skipped whole.
+    """
+    tokens = body.split()
+    # The token count bounds the output, so it is allocated once instead of growing.
+    out = np.empty(len(tokens), dtype=np.float64)
+    n = 0
+    for tok in tokens:
+        try:
+            out[n] = float(tok)
+        except ValueError:
+            # ignore weird tokens
+            continue
+        n += 1
+    return out[:n]
 
 
 def _infer_nports(filename: str) -> int:
@@ -142,18 +344,22 @@ def _parse_z0(parts: List[str]) -> float:
     return 50.0
 
 
-def _to_complex(a: np.ndarray, b: np.ndarray, fmt: str) -> np.ndarray:
+_DEG = np.pi / 180.0
+
+
+def _to_ri(a: np.ndarray, b: np.ndarray, fmt: str, dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert (a, b) pairs of the given format into separate real/imag arrays of dtype."""
     fmt = fmt.upper()
-    if fmt == "RI":
-        return a + 1j * b
+    a = np.ascontiguousarray(a, dtype=dtype)
+    b = np.ascontiguousarray(b, dtype=dtype)
     if fmt == "MA":
         # magnitude, angle in degrees
-        ang = np.deg2rad(b)
-        return a * (np.cos(ang) + 1j * np.sin(ang))
+        ang = b * _DEG
+        return a * np.cos(ang), a * np.sin(ang)
     if fmt == "DB":
         # dB magnitude, angle in degrees
-        mag = 10 ** (a / 20.0)
-        ang = np.deg2rad(b)
-        return mag * (np.cos(ang) + 1j * np.sin(ang))
-    # default RI
-    return a + 1j * b
+        mag = 10.0 ** (a * 0.05)
+        ang = b * _DEG
+        return mag * np.cos(ang), mag * np.sin(ang)
+    # RI (and default)
+    return a, b
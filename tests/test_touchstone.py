@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pytest
+
+from snp_viewer import touchstone
+from snp_viewer.touchstone import read_touchstone
+
+
+def _write(tmp_path, name, text):
+    p = tmp_path / name
+    p.write_text(text)
+    return p
+
+
+def test_stray_tokens_are_skipped_whole(tmp_path, monkeypatch):
+    monkeypatch.setattr(touchstone, "_touchstone_c", None)
+    p = _write(tmp_path, "a.s1p", "# GHZ S RI R 50\n1.0 0.5 0.1 S11\n2.0 0.4 0.2\n")
+    data = read_touchstone(p, dtype=np.float64)
+    np.testing.assert_array_equal(data.freq_hz, [1e9, 2e9])
+    np.testing.assert_array_equal(data.s[:, 0, 0], [0.5 + 0.1j, 0.4 + 0.2j])
+
+
+def test_parse_tokens_matches_float():
+    body = b"1.5 S11 1.0e 1,5 nan -inf 1e400 +.5 x2 2"
+    out = touchstone._parse_numbers(body)
+    np.testing.assert_array_equal(out, [1.5, np.nan, -np.inf, np.inf, 0.5, 2.0])
+
+
+def test_old_numpy_skips_fromstring(monkeypatch):
+    # NumPy < 2 truncates at a stray token with only a warning, so fromstring is not used there.
+    def fromstring(body, dtype, sep):
+        raise AssertionError("fromstring used on NumPy < 2")
+
+    monkeypatch.setattr(touchstone, "_FROMSTRING_RAISES", False)
+    monkeypatch.setattr(touchstone.np, "fromstring", fromstring)
+    np.testing.assert_array_equal(touchstone._parse_numbers(b"1 junk 2"), [1.0, 2.0])
+
+
+def test_native_parser_matches_python_path():
+    _touchstone_c = pytest.importorskip("snp_viewer._touchstone_c")
+    body = (
+        b"! comment 1 2 3\n"
+        b"  # GHZ S RI R 50\n"
+        b"1.0 0.5 S11 1.0e 1,5 nan -inf 1e400 +.5 1_000 2!inline 7\n"
+        b"\v# not an option line 9\n"
+        b"6!cr comment 1\r# cr option line 8\r"
+        b"\t3 " + b"1" * 80 + b" 4.25\n"
+        b"x2 5"
+    )
+    expected = touchstone._parse_body(body)
+    np.testing.assert_array_equal(_touchstone_c.parse(body), expected)
+    np.testing.assert_array_equal(
+        expected,
+        [1.0, 0.5, np.nan, -np.inf, np.inf, 0.5, 1000.0, 2.0, 9.0, 6.0, 3.0, float("1" * 80), 4.25, 5.0],
+    )
+
+
+def test_cr_only_line_endings(tmp_path, monkeypatch):
+    monkeypatch.setattr(touchstone, "_touchstone_c", None)
+    path = _write(tmp_path, "mac.s1p", "! c\r# GHZ S RI R 50\r1 0.5 0.1\r2 0.25 0.2\r")
+    data = read_touchstone(path, dtype=np.float64)
+    np.testing.assert_array_equal(data.freq_hz, [1e9, 2e9])
+    np.testing.assert_array_equal(data.s[:, 0, 0], [0.5 + 0.1j, 0.25 + 0.2j])
+
+
+def test_symmetric_requires_exact_reciprocity(tmp_path):
+    exact = _write(tmp_path, "exact.s2p", "# HZ S RI R 50\n1 0.1 0 0.5 0.2 0.5 0.2 0.3 0\n")
+    data = read_touchstone(exact, dtype=np.float64, symmetric=True)
+    assert data.symmetric
+    assert data.s_re.shape == (1, 3)
+    np.testing.assert_array_equal(data.get(0, 1), data.get(1, 0))
+
+    # S12 differs from S21 by far less than allclose's default tolerance.
+    near = _write(tmp_path, "near.s2p", "# HZ S RI R 50\n1 0.1 0 1e-9 0 2e-9 0 0.3 0\n")
+    data = read_touchstone(near, dtype=np.float64, symmetric=True)
+    assert not data.symmetric
+    assert data.get(0, 1)[0] == 1e-9
+    assert data.get(1, 0)[0] == 2e-9
+
+
+def test_corrupt_cache_is_reparsed(tmp_path):
+    p = _write(tmp_path, "a.s2p", "# HZ S RI R 50\n1 0.1 0 0.5 0.2 0.5 0.2 0.3 0\n")
+    first = read_touchstone(p, cache=True)
+    cache_path = tmp_path / "a.s2p.npz"
+    cache_path.write_bytes(cache_path.read_bytes()[:50])
+
+    data = read_touchstone(p, cache=True)
+    np.testing.assert_array_equal(data.s, first.s)
+    # The truncated cache was replaced by a good one.
+    np.testing.assert_array_equal(read_touchstone(p, cache=True).s, first.s)
+    assert np.load(cache_path)["s_re"].shape == first.s_re.shape
+
+
+def test_cache_is_dropped_when_source_is_replaced_by_older_file(tmp_path):
+    p = _write(tmp_path, "a.s1p", "# HZ S RI R 50\n1 0.5 0\n")
+    assert read_touchstone(p, dtype=np.float64, cache=True).s[0, 0, 0] == 0.5
+    cache_mtime = (tmp_path / "a.s1p.npz").stat().st_mtime_ns
+
+    # Same size, different data, and older than the cache (e.g. restored from a backup).
+    p.write_text("# HZ S RI R 50\n1 0.7 0\n")
+    os.utime(p, ns=(cache_mtime - 10**9, cache_mtime - 10**9))
+    assert read_touchstone(p, dtype=np.float64, cache=True).s[0, 0, 0] == 0.7
+
+
+@pytest.mark.parametrize("fmt", ["RI", "MA", "DB"])
+def test_two_port_cells_match_baseline_formulas(tmp_path, monkeypatch, fmt):
+    monkeypatch.setattr(touchstone, "_touchstone_c", None)
+    # Pairs in file order; each one is distinct so a swapped cell shows up.
+    pairs = np.array([[0.9, 10.0], [-3.0, -45.0], [0.25, 120.0], [-20.0, 170.0]])
+    line = "1 " + " ".join("%.17g %.17g" % (a, b) for a, b in pairs)
+    data = read_touchstone(_write(tmp_path, "p.s2p", f"# GHZ S {fmt} R 50\n{line}\n"), dtype=np.float64)
+
+    a, b = pairs[:, 0], pairs[:, 1]
+    if fmt == "RI":
+        want = a + 1j * b
+    elif fmt == "MA":
+        want = a * (np.cos(np.deg2rad(b)) + 1j * np.sin(np.deg2rad(b)))
+    else:
+        want = 10 ** (a / 20.0) * (np.cos(np.deg2rad(b)) + 1j * np.sin(np.deg2rad(b)))
+    # Pairs fill the matrix row by row: S11, S12, S21, S22.
+    np.testing.assert_allclose(data.s[0], want.reshape(2, 2), rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(data.get(0, 1), want[[1]], rtol=1e-12)
+    np.testing.assert_allclose(data.get(1, 0), want[[2]], rtol=1e-12)
+
+
+def test_cache_hit_round_trip(tmp_path, monkeypatch):
+    p = _write(tmp_path, "r.s2p", "! c\n# MHZ S MA R 75\n1 0.9 10 0.5 20 0.4 30 0.1 40\n2 0.8 11 0.5 21 0.4 31 0.2 41\n")
+    first = read_touchstone(p, cache=True)
+
+    def parse(path, dtype):
+        raise AssertionError("cache not used")
+
+    monkeypatch.setattr(touchstone, "_parse_touchstone", parse)
+    hit = read_touchstone(p, cache=True)
+    for name in ("freq_hz", "s_re", "s_im"):
+        np.testing.assert_array_equal(getattr(hit, name), getattr(first, name))
+        assert getattr(hit, name).dtype == getattr(first, name).dtype
+    assert (hit.nports, hit.fmt, hit.z0) == (2, "MA", 75.0)